@@ -0,0 +1,76 @@
+"""
+测试公用部分: 每个用例一个全新的临时 AGM_HOME，源 App 用 agm_bench 生成的小号合成 Bundle。
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import ag_manager as agm  # noqa: E402
+import agm_bench  # noqa: E402
+
+def tree_digest(path):
+    """目录树内容: {相对路径: 文件内容 / ("link", 目标) / "dir"}，用于比较两次的结果"""
+    out = {}
+    for root, dirs, files in os.walk(path):
+        rel_root = os.path.relpath(root, path)
+        for d in dirs:
+            full = os.path.join(root, d)
+            out[os.path.normpath(os.path.join(rel_root, d))] = (
+                ("link", os.readlink(full)) if os.path.islink(full) else "dir")
+        for f in files:
+            full = os.path.join(root, f)
+            if os.path.islink(full):
+                out[os.path.normpath(os.path.join(rel_root, f))] = ("link", os.readlink(full))
+            else:
+                with open(full, "rb") as fh:
+                    out[os.path.normpath(os.path.join(rel_root, f))] = fh.read()
+    return out
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+class AGMTestCase(unittest.TestCase):
+    """临时 AGM_HOME + ConfigManager + AppPowerManager。日志 (print) 不输出到终端"""
+    config = {}
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp(prefix="agm-test-")
+        self.addCleanup(shutil.rmtree, self.home, ignore_errors=True)
+        stack = contextlib.ExitStack()
+        self.addCleanup(stack.close)
+        stack.enter_context(mock.patch.dict(os.environ, {"AGM_HOME": self.home}))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+        self.source = os.path.join(self.home, "src", "Antigravity.app")
+        agm_bench.make_bundle(self.source, files=20, frameworks=1, binary_size=16 * 1024)
+        self.config_file = os.path.join(self.home, "config.json")
+        with open(self.config_file, "w") as f:
+            json.dump({"original_app_path": self.source, "apps_dir": os.path.join(self.home, "apps"),
+                       "data_dir": os.path.join(self.home, "data"), "accounts": [], **self.config}, f)
+        self.cfg = agm.ConfigManager(self.config_file)
+        self.addCleanup(self.cfg.flush)
+        self.mgr = agm.AppPowerManager(self.cfg)
+        # 不拉起脱离终端的清理进程: 清理由用例自己调用 trash.reap()
+        self.spawn_reaper = stack.enter_context(mock.patch.object(self.mgr.trash, "spawn_reaper"))
+
+    def create_instance(self, name):
+        """新建实例 (克隆 Bundle) 并在数据目录里放几个文件"""
+        self.cfg.add_account(name)
+        self.mgr.ensure_app_created(name)
+        data = self.mgr.get_data_path(name)
+        write_file(os.path.join(data, "user_data", "User", "settings.json"), '{\n  // keep\n  "a": 1\n}\n')
+        write_file(os.path.join(data, "user_data", "state.db"), os.urandom(300 * 1024))
+        write_file(os.path.join(data, "extensions", "pub.ext-1.0.0", "package.json"), '{"name": "ext"}')
+        return self.mgr.get_app_path(name), data
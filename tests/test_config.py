@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+import unittest
+
+from support import AGMTestCase, agm
+
+class ConfigMergeTest(AGMTestCase):
+    # debounce 窗口足够长，写盘只在用例显式 flush() 时发生
+    config = {"save_debounce": 60}
+
+    def setUp(self):
+        super().setUp()
+        with self.cfg.batch():
+            for name in ("a", "b", "c"):
+                self.cfg.add_account(name)
+        self.cfg.flush()
+        self.other = agm.ConfigManager(self.config_file)  # 另一个进程 (如命令行)
+        self.addCleanup(self.other.flush)
+
+    def on_disk(self):
+        with open(self.config_file) as f:
+            return json.load(f)
+
+    def test_saves_are_coalesced_until_flush(self):
+        before = os.stat(self.config_file).st_mtime_ns
+        for i in range(20):
+            self.cfg.update_account("a", note=str(i))
+        self.assertEqual(os.stat(self.config_file).st_mtime_ns, before)
+        self.cfg.flush()
+        self.assertEqual(self.on_disk()["accounts"][0]["note"], "19")
+        self.assertEqual([f for f in os.listdir(self.home) if ".tmp." in f], [])
+
+    def test_dirty_account_keeps_its_position_when_another_process_writes(self):
+        self.cfg.update_account("b", note="edited in GUI")
+        self.other.add_account("z")
+        self.other.update_account("a", proxy_url="socks5://127.0.0.1:1080")
+        self.other.flush()
+        self.cfg.flush()
+
+        accounts = self.on_disk()["accounts"]
+        self.assertEqual([a["name"] for a in accounts], ["a", "b", "c", "z"])
+        self.assertEqual(accounts[0]["proxy_url"], "socks5://127.0.0.1:1080")
+        self.assertEqual(accounts[1]["note"], "edited in GUI")
+        self.assertEqual([a["name"] for a in self.cfg.get_accounts()], ["a", "b", "c", "z"])
+
+    def test_deletes_and_new_accounts_merge_with_other_process(self):
+        self.cfg.delete_account("a")
+        self.cfg.add_account("new")
+        self.cfg.set("trash_retention", 60)
+        self.other.delete_account("c")
+        self.other.set("proxy_check", "warn")
+        self.other.flush()
+        self.cfg.flush()
+
+        saved = self.on_disk()
+        self.assertEqual([a["name"] for a in saved["accounts"]], ["b", "new"])
+        self.assertEqual((saved["proxy_check"], saved["trash_retention"]), ("warn", 60))
+
+    def test_flush_waits_for_the_file_lock(self):
+        self.cfg.update_account("a", note="locked")
+        release = threading.Event()
+        locked = threading.Event()
+
+        def hold():
+            with self.other._file_lock():
+                locked.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        locked.wait(5)
+        writer = threading.Thread(target=self.cfg.flush)
+        writer.start()
+        time.sleep(0.2)
+        self.assertTrue(writer.is_alive())
+        self.assertEqual(self.on_disk()["accounts"][0].get("note"), "")
+        release.set()
+        writer.join(5)
+        holder.join(5)
+        self.assertEqual(self.on_disk()["accounts"][0]["note"], "locked")
+
+if __name__ == "__main__":
+    unittest.main()
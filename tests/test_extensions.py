@@ -0,0 +1,95 @@
+import os
+import stat
+import unittest
+from unittest import mock
+
+from support import AGMTestCase, tree_digest, write_file
+
+EXT = "pub.ext-1.0.0"
+
+class ExtensionStoreTest(AGMTestCase):
+    config = {"extension_store": "hardlink"}
+
+    def setUp(self):
+        super().setUp()
+        self.store = self.mgr.extensions
+        self.dirs = {}
+        for name in ("alpha", "beta"):
+            _, data = self.create_instance(name)
+            ext_dir = os.path.join(data, "extensions")
+            write_file(os.path.join(ext_dir, EXT, "out", "main.js"), b"console.log(1)")
+            write_file(os.path.join(ext_dir, EXT, "bin", "tool"), b"#!/bin/sh\n")
+            os.chmod(os.path.join(ext_dir, EXT, "bin", "tool"), 0o755)
+            write_file(os.path.join(ext_dir, "extensions.json"), f'[{{"location": "{ext_dir}"}}]')
+            self.dirs[name] = ext_dir
+
+    def test_identical_extensions_are_stored_once(self):
+        before = tree_digest(self.dirs["beta"])
+        self.assertEqual(self.store.dedupe("alpha")["stored"], 1)
+        result = self.store.dedupe("beta")
+        self.assertEqual((result["stored"], result["linked"]), (0, 1))
+
+        packages = self.store.packages()
+        self.assertEqual(len(packages), 1)
+        self.assertEqual(packages[0]["refs"], 2)
+        self.assertTrue(packages[0]["key"].startswith(EXT + "-"))
+        # 实例里的插件路径和内容不变，文件与仓库共享 inode 且只读
+        self.assertEqual(tree_digest(self.dirs["beta"]), before)
+        a = os.stat(os.path.join(self.dirs["alpha"], EXT, "out", "main.js"))
+        b = os.stat(os.path.join(self.dirs["beta"], EXT, "out", "main.js"))
+        self.assertEqual((a.st_ino, a.st_dev), (b.st_ino, b.st_dev))
+        self.assertFalse(a.st_mode & stat.S_IWUSR)
+        self.assertTrue(os.stat(os.path.join(self.dirs["beta"], EXT, "bin", "tool")).st_mode & stat.S_IXUSR)
+        # 实例自己的 extensions.json 不共享
+        self.assertEqual(os.stat(os.path.join(self.dirs["beta"], "extensions.json")).st_nlink, 1)
+
+    def test_same_name_with_different_content_gets_its_own_entry(self):
+        write_file(os.path.join(self.dirs["beta"], EXT, "out", "main.js"), b"console.log(2)")
+        self.store.dedupe("alpha")
+        self.assertEqual(self.store.dedupe("beta")["stored"], 1)
+        self.assertEqual(sorted(p["refs"] for p in self.store.packages()), [1, 1])
+
+    def test_unchanged_directories_are_not_rehashed(self):
+        self.store.dedupe("alpha")
+        with mock.patch.object(self.store, "package_key", side_effect=AssertionError("rehashed")):
+            self.assertEqual(self.store.dedupe("alpha")["unchanged"], 1)
+
+    def test_running_instance_is_skipped(self):
+        with mock.patch.object(self.mgr.supervisor, "running", return_value={"alpha"}):
+            self.assertEqual(self.store.dedupe("alpha")["stored"], 0)
+        self.assertEqual(self.store.packages(), [])
+
+    def test_gc_removes_only_unreferenced_entries(self):
+        self.store.dedupe("alpha")
+        self.store.dedupe("beta")
+        self.mgr.delete_resources("alpha", delete_data=True)
+        self.cfg.delete_account("alpha")
+        self.assertEqual(self.store.gc(), [])
+        self.assertEqual(self.store.packages()[0]["refs"], 1)
+
+        self.mgr.delete_resources("beta", delete_data=True)
+        self.cfg.delete_account("beta")
+        key = self.store.packages()[0]["key"]
+        self.assertEqual(self.store.gc(dry_run=True), [key])
+        self.assertEqual(len(self.store.packages()), 1)
+        self.assertEqual(self.store.gc(), [key])
+        self.assertEqual(self.store.packages(), [])
+        # 仓库条目进了回收站 (只读文件也能被清理器删掉)
+        self.assertIn("extension", [e["kind"] for e in self.mgr.trash.entries()])
+        self.mgr.trash.reap(force=True)
+        self.assertEqual(self.mgr.trash.entries(), [])
+
+class ExtensionStoreCloneModeTest(AGMTestCase):
+    def test_volume_without_cow_leaves_instances_untouched(self):
+        _, data = self.create_instance("alpha")
+        before = tree_digest(data)
+        result = self.mgr.extensions.dedupe("alpha")
+        self.assertEqual(tree_digest(data), before)
+        if self.mgr.extensions._cow_unsupported:
+            self.assertEqual(result["stored"], 0)
+            self.assertEqual(self.mgr.extensions.packages(), [])
+        else:
+            self.assertEqual(result["stored"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import unittest
+
+from support import AGMTestCase, write_file
+
+class GarbageCollectorTest(AGMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app, self.data = self.create_instance("alpha")
+        self.create_instance("beta")
+        self.bin_dir = os.path.join(self.app, "Contents", "MacOS")
+
+    def found(self):
+        return sorted((c["kind"], os.path.relpath(c["path"], self.home)) for c in self.mgr.gc.find())
+
+    def test_live_instances_are_not_candidates(self):
+        self.assertEqual(self.found(), [])
+
+    def test_finds_orphaned_bundle_and_data(self):
+        self.cfg.delete_account("beta")
+        self.assertEqual(self.found(), [("bundle", "apps/Antigravity-beta.app"), ("data", "data/beta")])
+
+    def test_restore_backups_and_trash_are_not_orphans(self):
+        self.mgr.snapshot_instance("alpha")
+        self.mgr.restore_instance("alpha")
+        self.assertTrue(os.path.isdir(self.data + ".before-restore"))
+        write_file(os.path.join(self.data + ".restoring", "user_data", "x"), b"")
+        write_file(os.path.join(os.path.dirname(self.data), "gamma.agm_tmp", "user_data", "x"), b"")
+        self.mgr.delete_resources("beta", delete_data=True)
+        self.cfg.delete_account("beta")
+        self.assertTrue(os.path.isdir(os.path.join(os.path.dirname(self.data), ".agm_trash")))
+        self.assertEqual(self.found(), [])
+
+    def test_only_generated_binary_names_are_candidates(self):
+        stamps_path = os.path.join(self.bin_dir, ".agm_binaries.json")
+        with open(stamps_path) as f:
+            stamps = json.load(f)
+        stamps["Electron_renamed"] = {}
+        with open(stamps_path, "w") as f:
+            json.dump(stamps, f)
+        for name in ("Electron_renamed", "Electron_beta", "Electron_helper", "Electron_alpha_old"):
+            write_file(os.path.join(self.bin_dir, name), b"bin")
+
+        self.assertEqual(self.found(), [("binary", "apps/Antigravity-alpha.app/Contents/MacOS/Electron_beta"),
+                                        ("binary", "apps/Antigravity-alpha.app/Contents/MacOS/Electron_renamed")])
+        self.assertTrue(os.path.exists(os.path.join(self.bin_dir, "Electron_alpha")))
+
+    def test_collect_trashes_trees_and_removes_binaries(self):
+        self.cfg.delete_account("beta")
+        stale = os.path.join(self.bin_dir, "Electron_beta")
+        shutil.copy(os.path.join(self.bin_dir, "Electron_alpha"), stale)
+        stamps_path = os.path.join(self.bin_dir, ".agm_binaries.json")
+        with open(stamps_path) as f:
+            stamps = json.load(f)
+        stamps["Electron_beta"] = stamps["Electron_alpha"]
+        with open(stamps_path, "w") as f:
+            json.dump(stamps, f)
+
+        dry = self.mgr.gc.collect(dry_run=True)
+        self.assertEqual(len(dry["removed"]), 3)
+        self.assertTrue(os.path.exists(stale))
+        self.assertTrue(os.path.isdir(self.mgr.get_data_path("beta")))
+
+        report = self.mgr.gc.collect()
+        self.assertEqual(len(report["removed"]), 3)
+        self.assertFalse(os.path.lexists(stale))
+        with open(stamps_path) as f:
+            self.assertEqual(sorted(json.load(f)), ["Electron_alpha"])
+        # 目录类候选进回收站，撤销期内还能找回
+        self.assertEqual(sorted(e["kind"] for e in self.mgr.trash.entries()), ["bundle", "data"])
+        self.assertEqual(self.found(), [])
+        self.assertTrue(os.path.isdir(self.data))
+        self.assertTrue(os.path.exists(os.path.join(self.bin_dir, "Electron_alpha")))
+
+if __name__ == "__main__":
+    unittest.main()
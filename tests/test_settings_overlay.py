@@ -0,0 +1,52 @@
+import os
+import unittest
+
+from support import AGMTestCase, agm, write_file
+
+SETTINGS = """{
+  // 用户自己的注释
+  "editor.fontSize": 14, /* 行尾块注释 */
+  "http.proxyStrictSSL": 1,
+  "flag": true,
+  "nested": {"a": 0},
+  "list": [1, 0],
+}
+"""
+
+class SettingsOverlayTest(AGMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.home, "User", "settings.json")
+        write_file(self.path, SETTINGS)
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_comments_and_untouched_keys_survive(self):
+        changed = self.mgr.overlays.apply(self.path, {"http.proxy": "socks5://127.0.0.1:1080",
+                                                      "editor.fontSize": None})
+        self.assertEqual(sorted(changed), ["editor.fontSize", "http.proxy"])
+        text = self.read()
+        self.assertIn("// 用户自己的注释", text)
+        self.assertNotIn("editor.fontSize", text)
+        doc = agm.JSONCDocument(text)
+        self.assertEqual(doc.get("http.proxy"), "socks5://127.0.0.1:1080")
+        self.assertEqual(doc.get("nested"), {"a": 0})
+
+    def test_unchanged_overlay_does_not_write(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        self.assertEqual(self.mgr.overlays.apply(self.path, {"editor.fontSize": 14, "list": [1, 0]}), [])
+        self.assertEqual(self.read(), SETTINGS)
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+    def test_bool_and_number_are_different_values(self):
+        overlay = {"http.proxyStrictSSL": True, "flag": 1, "nested": {"a": False}, "list": [True, False]}
+        self.assertEqual(sorted(self.mgr.overlays.apply(self.path, overlay)), sorted(overlay))
+        doc = agm.JSONCDocument(self.read())
+        for key, value in overlay.items():
+            self.assertEqual(repr(doc.get(key)), repr(value))
+        self.assertEqual(self.mgr.overlays.apply(self.path, overlay), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from support import AGMTestCase, agm, write_file
+
+# 没有版本头的旧版 Shim (v1 时代安装时写入的模板，节选)
+LEGACY_SHIM = """#!/bin/bash
+# Antigravity Electron Shim (Plan F)
+DIR=$(cd "$(dirname "$0")"; pwd)
+ORIGINAL="$DIR/Electron.original"
+exec "$ORIGINAL" "$@"
+"""
+
+ECHO_ARGS = '#!/bin/sh\nfor a in "$@"; do printf "%s\\n" "$a"; done\n'
+
+class RenderShimTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "Electron")
+
+    def test_header_round_trip(self):
+        path = self.path
+        target = "/Apps/Antigravity-a b.app/Contents/MacOS/Electron_a-b"
+        write_file(path, agm.render_shim("a-b", target))
+        self.assertEqual(agm.read_shim_header(path), {"version": agm.SHIM_VERSION, "instance": "a-b", "target": target})
+
+    def test_non_shims(self):
+        path = self.path
+        self.assertIsNone(agm.read_shim_header(path))
+        write_file(path, b"\xcf\xfa\xed\xfe binary")
+        self.assertIsNone(agm.read_shim_header(path))
+        write_file(path, LEGACY_SHIM)
+        self.assertEqual(agm.read_shim_header(path), {"version": 0})
+
+class ShimInstallTest(AGMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app, _ = self.create_instance("alpha")
+
+    def shim(self, rel=agm.SHIM_TARGETS[0]):
+        return os.path.join(self.app, rel)
+
+    def test_installed_shims_are_current_and_exec_with_arguments(self):
+        self.assertEqual(self.mgr.shim_versions("alpha"), {rel: agm.SHIM_VERSION for rel in agm.SHIM_TARGETS})
+        self.assertTrue(all(self.mgr.shim_is_current("alpha", rel) for rel in agm.SHIM_TARGETS))
+        with open(self.shim() + agm.SHIM_BACKUP_SUFFIX, "rb") as f, \
+                open(os.path.join(self.source, agm.SHIM_TARGETS[0]), "rb") as g:
+            self.assertEqual(f.read(), g.read())
+
+        target = self.mgr.shim_target("alpha", agm.SHIM_TARGETS[0])
+        write_file(target, ECHO_ARGS)
+        os.chmod(target, 0o755)
+        args = ["--flag", "two words", "it's", "$HOME", ""]
+        out = subprocess.run([self.shim()] + args, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split("\n")[:-1], args)
+
+    def test_reinstall_of_a_current_shim_is_a_no_op(self):
+        before = os.stat(self.shim())
+        self.assertEqual(self.mgr.upgrade_shims(), {"alpha": 0})
+        after = os.stat(self.shim())
+        self.assertEqual((after.st_ino, after.st_mtime_ns), (before.st_ino, before.st_mtime_ns))
+
+    def test_legacy_shim_is_upgraded_without_touching_the_backup(self):
+        with open(self.shim() + agm.SHIM_BACKUP_SUFFIX, "rb") as f:
+            original = f.read()
+        write_file(self.shim(), LEGACY_SHIM)
+        self.assertEqual(self.mgr.shim_versions("alpha")[agm.SHIM_TARGETS[0]], 0)
+
+        self.assertEqual(self.mgr.upgrade_shims(), {"alpha": 1})
+        self.assertTrue(self.mgr.shim_is_current("alpha", agm.SHIM_TARGETS[0]))
+        with open(self.shim() + agm.SHIM_BACKUP_SUFFIX, "rb") as f:
+            self.assertEqual(f.read(), original)
+        leftovers = [f for _, _, fs in os.walk(self.app) for f in fs if f.endswith(".agm_tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_moved_bundle_gets_shims_pointing_at_the_new_location(self):
+        new_apps = os.path.join(self.home, "moved apps")
+        os.rename(os.path.dirname(self.app), new_apps)
+        self.cfg.set("apps_dir", new_apps)
+        self.assertFalse(any(self.mgr.shim_is_current("alpha", rel) for rel in agm.SHIM_TARGETS))
+
+        self.assertEqual(self.mgr.upgrade_shims(), {"alpha": 2})
+        for rel in agm.SHIM_TARGETS:
+            header = agm.read_shim_header(os.path.join(self.mgr.get_app_path("alpha"), rel))
+            self.assertTrue(header["target"].startswith(new_apps + os.sep))
+            self.assertTrue(os.path.exists(header["target"]))
+        subprocess.run([os.path.join(self.mgr.get_app_path("alpha"), agm.SHIM_TARGETS[0])], check=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+from support import AGMTestCase, agm, tree_digest, write_file
+
+class SnapshotRestoreTest(AGMTestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.data = self.create_instance("alpha")
+        # 多块的大文件 + 空文件 + 软链 + 会被排除的缓存目录
+        write_file(os.path.join(self.data, "user_data", "big.bin"), os.urandom(3 * 1024 * 1024))
+        write_file(os.path.join(self.data, "user_data", "empty"), b"")
+        os.symlink("state.db", os.path.join(self.data, "user_data", "state-link"))
+        write_file(os.path.join(self.data, "user_data", "Cache", "c0"), b"cache")
+
+    def expected(self):
+        tree = tree_digest(self.data)
+        return {k: v for k, v in tree.items() if not k.startswith(os.path.join("user_data", "Cache"))}
+
+    def test_round_trip_restores_identical_data(self):
+        before = self.expected()
+        self.mgr.snapshot_instance("alpha")
+        shutil.rmtree(os.path.join(self.data, "extensions"))
+        write_file(os.path.join(self.data, "user_data", "state.db"), b"corrupted")
+        write_file(os.path.join(self.data, "user_data", "new"), b"new")
+
+        self.mgr.restore_instance("alpha")
+        self.assertEqual(tree_digest(self.data), before)
+        self.assertFalse(os.path.lexists(self.data + ".restoring"))
+        # 换下来的数据保留在 .before-restore
+        previous = tree_digest(self.data + ".before-restore")
+        self.assertEqual(previous[os.path.join("user_data", "state.db")], b"corrupted")
+        self.assertIn(os.path.join("user_data", "new"), previous)
+
+    def test_second_restore_keeps_the_first_backup_recoverable(self):
+        self.mgr.snapshot_instance("alpha")
+        state = os.path.join("user_data", "state.db")
+        write_file(os.path.join(self.data, "user_data", "state.db"), b"never snapshotted")
+        first_backup = tree_digest(self.data)
+        self.mgr.restore_instance("alpha")
+        write_file(os.path.join(self.data, "user_data", "state.db"), b"second")
+        self.mgr.restore_instance("alpha")
+
+        previous = self.data + ".before-restore"
+        self.assertEqual(tree_digest(previous)[state], b"second")
+        # 第一次的 .before-restore 进了回收站，挪开当前的备份后可以原样找回
+        entry = next(e for e in self.mgr.trash.entries() if e["path"] == previous)
+        self.assertTrue(entry["restorable"])
+        os.rename(previous, previous + ".second")
+        self.mgr.trash.restore(entry["id"])
+        self.assertEqual(tree_digest(previous), first_backup)
+
+    def test_restore_picks_the_requested_snapshot(self):
+        first = self.mgr.snapshot_instance("alpha")
+        before = self.expected()
+        write_file(os.path.join(self.data, "user_data", "User", "settings.json"), '{"a": 2}')
+        second = self.mgr.snapshot_instance("alpha")
+        self.assertNotEqual(first["id"], second["id"])
+        # 第二次快照只有改过的文件需要重新分块
+        self.assertEqual(second["reused"], second["files"] - 1)
+
+        self.mgr.restore_instance("alpha", first["id"])
+        self.assertEqual(tree_digest(self.data), before)
+        self.mgr.restore_instance("alpha", second["id"])
+        with open(os.path.join(self.data, "user_data", "User", "settings.json")) as f:
+            self.assertEqual(f.read(), '{"a": 2}')
+
+    def test_failed_restore_leaves_current_data_untouched(self):
+        self.mgr.snapshot_instance("alpha")
+        before = tree_digest(self.data)
+        with mock.patch.object(self.mgr.snapshots, "get_chunk", side_effect=OSError("chunk missing")):
+            with self.assertRaises(OSError):
+                self.mgr.restore_instance("alpha")
+        self.assertEqual(tree_digest(self.data), before)
+        self.assertFalse(os.path.lexists(self.data + ".restoring"))
+        self.assertFalse(os.path.lexists(self.data + ".before-restore"))
+
+    def test_restore_refuses_running_instance(self):
+        self.mgr.snapshot_instance("alpha")
+        with mock.patch.object(self.mgr.supervisor, "running", return_value={"alpha"}):
+            with self.assertRaises(RuntimeError):
+                self.mgr.restore_instance("alpha")
+
+    def test_delete_does_not_snapshot_by_default(self):
+        self.mgr.delete_resources("alpha", delete_data=True)
+        self.assertEqual(self.mgr.snapshots.list("alpha"), [])
+
+class SnapshotSummaryTest(AGMTestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.data = self.create_instance("alpha")
+        self.store = self.mgr.snapshots
+        self.ids = [self.mgr.snapshot_instance("alpha")["id"] for _ in range(3)]
+
+    def test_list_reads_only_summaries(self):
+        with mock.patch.object(agm.gzip, "open", side_effect=AssertionError("full manifest parsed")):
+            snaps = self.store.list("alpha")
+        self.assertEqual([m["id"] for m in snaps], self.ids)
+        self.assertTrue(all("entries" not in m and m["files"] == 3 for m in snaps))
+
+    def test_snapshot_parses_only_the_previous_manifest(self):
+        with mock.patch.object(self.store, "load", wraps=self.store.load) as load:
+            self.mgr.snapshot_instance("alpha")
+        load.assert_called_once_with("alpha", self.ids[-1])
+
+    def test_manifests_without_summary_are_backfilled(self):
+        summary = os.path.join(self.store._manifest_dir("alpha"), self.ids[0] + self.store.SUMMARY_SUFFIX)
+        os.unlink(summary)
+        self.assertEqual([m["id"] for m in self.store.list("alpha")], self.ids)
+        self.assertTrue(os.path.exists(summary))
+
+    def test_prune_removes_manifest_and_summary(self):
+        self.assertEqual(self.store.prune("alpha", 1), self.ids[:2])
+        self.assertEqual(sorted(os.listdir(self.store._manifest_dir("alpha"))),
+                         sorted([self.ids[2] + self.store.MANIFEST_SUFFIX, self.ids[2] + self.store.SUMMARY_SUFFIX]))
+
+class SnapshotBeforeDeleteTest(AGMTestCase):
+    config = {"snapshot_before_delete": True}
+
+    def test_delete_snapshots_first_when_enabled(self):
+        _, data = self.create_instance("alpha")
+        before = tree_digest(data)
+        self.mgr.delete_resources("alpha", delete_data=True)
+        self.assertEqual(len(self.mgr.snapshots.list("alpha")), 1)
+        self.mgr.restore_instance("alpha")
+        self.assertEqual(tree_digest(data), before)
+
+    def test_snapshot_failure_does_not_abort_delete(self):
+        app, data = self.create_instance("alpha")
+        with mock.patch.object(self.mgr.snapshots, "snapshot", side_effect=OSError("disk full")):
+            self.assertEqual(self.mgr.delete_resources("alpha", delete_data=True), (True, True))
+        self.assertFalse(os.path.lexists(app))
+        self.assertFalse(os.path.lexists(data))
+        self.assertEqual(self.mgr.undo_delete("alpha"), "alpha")
+        self.assertTrue(os.path.isdir(data))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import unittest
+from unittest import mock
+
+from support import AGMTestCase, agm, tree_digest, write_file
+
+RES = os.path.join("Contents", "Resources", "app", "out")
+
+class DeltaSyncTest(AGMTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.source, "Contents", "Resources", "app.asar"), os.urandom(64 * 1024))
+        self.app, _ = self.create_instance("alpha")
+        self.files = sorted(os.path.relpath(os.path.join(root, f), self.source)
+                            for root, _, fs in os.walk(os.path.join(self.source, RES)) for f in fs)
+
+    def instance_view(self):
+        """实例 Bundle 去掉 AGM 生成的文件，Shim 目标换回 .original 的内容，应与源 Bundle 一致"""
+        view = {rel: v for rel, v in tree_digest(self.app).items() if not agm.is_agm_managed_file(rel)}
+        for t in agm.SHIM_TARGETS:
+            with open(os.path.join(self.app, t + agm.SHIM_BACKUP_SUFFIX), "rb") as f:
+                view[t] = f.read()
+        return view
+
+    def bump(self, rel, data):
+        """改写源文件，并确保 mtime 一定变化"""
+        path = os.path.join(self.source, rel)
+        write_file(path, data)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    def test_unchanged_source_is_a_no_op(self):
+        report = self.mgr.sync_kernel("alpha")
+        self.assertFalse(report.changed)
+        self.assertEqual(report.bytes_written, 0)
+        self.assertEqual(self.instance_view(), tree_digest(self.source))
+
+    def test_applies_edits_additions_removals_and_relinks(self):
+        self.bump(self.files[0], b"changed content")
+        write_file(os.path.join(self.source, RES, "added", "new.js"), b"new")
+        os.unlink(os.path.join(self.source, self.files[1]))
+        # 文件变成目录
+        os.unlink(os.path.join(self.source, self.files[2]))
+        write_file(os.path.join(self.source, self.files[2], "inner.js"), b"inner")
+        framework = next(p for p in os.listdir(os.path.join(self.source, "Contents", "Frameworks")))
+        current = os.path.join(self.source, "Contents", "Frameworks", framework, "Versions", "Current")
+        os.makedirs(os.path.join(os.path.dirname(current), "B"))
+        os.unlink(current)
+        os.symlink("B", current)
+        os.chmod(os.path.join(self.source, self.files[-1]), 0o600)
+
+        report = self.mgr.sync_kernel("alpha")
+        self.assertIn(self.files[0].replace(os.sep, "/"), report.copied)
+        self.assertIn(f"{RES}/added/new.js".replace(os.sep, "/"), report.copied)
+        self.assertIn(self.files[1].replace(os.sep, "/"), report.removed)
+        self.assertEqual(len(report.relinked), 1)
+        self.assertGreaterEqual(report.meta_fixed, 1)
+        self.assertFalse(report.shim_changed)
+        self.assertEqual(self.instance_view(), tree_digest(self.source))
+        self.assertEqual(os.stat(os.path.join(self.app, self.files[-1])).st_mode & 0o777, 0o600)
+        self.assertFalse(self.mgr.sync_kernel("alpha").changed)
+
+    def test_changed_binary_updates_backup_and_keeps_shim(self):
+        electron = agm.SHIM_TARGETS[0]
+        shim = os.path.join(self.app, electron)
+        with open(shim, "rb") as f:
+            shim_text = f.read()
+        self.bump(electron, b"#!/bin/sh\nexit 0\n# new build\n")
+
+        report = self.mgr.sync_kernel("alpha")
+        self.assertTrue(report.shim_changed)
+        with open(shim, "rb") as f:
+            self.assertEqual(f.read(), shim_text)
+        renamed = os.path.join(os.path.dirname(shim), "Electron_alpha")
+        with open(renamed, "rb") as f:
+            self.assertEqual(f.read(), b"#!/bin/sh\nexit 0\n# new build\n")
+        self.assertEqual(self.instance_view(), tree_digest(self.source))
+
+    def test_update_never_writes_through_a_hardlinked_file(self):
+        asar = os.path.join("Contents", "Resources", "app.asar")
+        linked = os.stat(os.path.join(self.app, asar))
+        if linked.st_nlink < 2:
+            self.skipTest("bundle was not hardlinked on this volume")
+        original = os.path.join(self.home, "asar.before")
+        os.link(os.path.join(self.source, asar), original)
+        # 源 App 更新通常是整文件替换
+        tmp = os.path.join(self.source, asar + ".new")
+        write_file(tmp, b"new asar")
+        os.replace(tmp, os.path.join(self.source, asar))
+        self.mgr.sync_kernel("alpha")
+        with open(os.path.join(self.app, asar), "rb") as f:
+            self.assertEqual(f.read(), b"new asar")
+        self.assertEqual(os.stat(original).st_nlink, 1)  # 旧 inode 已无人引用，没有被就地改写
+
+    def test_hash_mode_skips_touched_files(self):
+        rel = self.files[0]
+        path = os.path.join(self.source, rel)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        syncer = agm.DeltaSyncer(self.mgr.cloner, verify="hash")
+        report = syncer.sync(self.source, self.app)
+        self.assertEqual(report.copied, [])
+        self.assertEqual(os.stat(os.path.join(self.app, rel)).st_mtime_ns, st.st_mtime_ns + 10 ** 9)
+
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10 ** 9))
+        report = agm.DeltaSyncer(self.mgr.cloner, verify="mtime").sync(self.source, self.app)
+        self.assertEqual(report.copied, [rel.replace(os.sep, "/")])
+
+    def test_failed_copy_leaves_no_temp_files(self):
+        self.bump(self.files[0], b"x" * 10)
+        clone_files = self.mgr.cloner.clone_files
+
+        def clone_then_fail(*args, **kwargs):
+            clone_files(*args, **kwargs)  # 临时文件已写出，再模拟中途失败
+            raise OSError("disk full")
+
+        with mock.patch.object(self.mgr.cloner, "clone_files", side_effect=clone_then_fail):
+            with self.assertRaises(OSError):
+                self.mgr.syncer.sync(self.source, self.app)
+        leftovers = [f for _, _, fs in os.walk(self.app) for f in fs if f.endswith(".agm_tmp")]
+        self.assertEqual(leftovers, [])
+        self.assertNotEqual(tree_digest(self.app)[self.files[0]], b"x" * 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import time
+import unittest
+
+from support import AGMTestCase, tree_digest
+
+class TrashTest(AGMTestCase):
+    def delete(self, name):
+        self.mgr.delete_resources(name, delete_data=True)
+        self.cfg.delete_account(name)
+
+    def test_delete_moves_into_trash_and_undo_restores_everything(self):
+        app, data = self.create_instance("alpha")
+        before = (tree_digest(app), tree_digest(data))
+        account = self.cfg.get_account("alpha")
+
+        self.delete("alpha")
+        self.assertFalse(os.path.lexists(app))
+        self.assertFalse(os.path.lexists(data))
+        self.assertIsNone(self.cfg.get_account("alpha"))
+        entries = self.mgr.trash.entries()
+        self.assertEqual(sorted(e["kind"] for e in entries), ["bundle", "data"])
+        self.assertEqual(len({e["op"] for e in entries}), 1)
+        self.assertTrue(all(e["restorable"] for e in entries))
+        # 回收站与原路径同卷: 就在原路径的父目录下
+        for e in entries:
+            self.assertEqual(os.path.dirname(os.path.dirname(e["entry"])), os.path.dirname(e["path"]))
+        self.spawn_reaper.assert_called_once()
+
+        self.assertEqual(self.mgr.undo_delete("alpha"), "alpha")
+        self.assertEqual((tree_digest(app), tree_digest(data)), before)
+        self.assertEqual(self.cfg.get_account("alpha"), account)
+        self.assertEqual(self.mgr.trash.entries(), [])
+
+    def test_undo_refuses_to_overwrite_a_recreated_instance(self):
+        app, _ = self.create_instance("alpha")
+        self.delete("alpha")
+        self.create_instance("alpha")
+        marker = os.path.join(app, "Contents", "new")
+        open(marker, "w").close()
+        with self.assertRaises(FileExistsError):
+            self.mgr.undo_delete("alpha")
+        self.assertTrue(os.path.exists(marker))
+        self.assertTrue(all(e["restorable"] for e in self.mgr.trash.entries()))
+
+    def test_reap_keeps_entries_within_retention(self):
+        self.create_instance("alpha")
+        self.delete("alpha")
+        removed, next_due = self.mgr.trash.reap()
+        self.assertEqual(removed, 0)
+        self.assertGreater(next_due, 0)
+        self.assertLessEqual(next_due, self.mgr.trash.retention)
+        self.assertEqual(len(self.mgr.trash.entries()), 2)
+
+    def test_reap_purges_expired_entries_and_undo_then_fails(self):
+        app, data = self.create_instance("alpha")
+        self.delete("alpha")
+        self.mgr.trash.retention = 0
+        removed, next_due = self.mgr.trash.reap()
+        self.assertEqual((removed, next_due), (2, None))
+        self.assertEqual(self.mgr.trash.entries(), [])
+        self.assertFalse(self.mgr.trash.pending())
+        with self.assertRaises(FileNotFoundError):
+            self.mgr.undo_delete("alpha")
+        self.assertFalse(os.path.lexists(app))
+        self.assertFalse(os.path.lexists(data))
+
+    def test_reap_resumes_a_claimed_entry_even_with_read_only_dirs(self):
+        _, data = self.create_instance("alpha")
+        self.delete("alpha")
+        entry = next(e for e in self.mgr.trash.entries() if e["kind"] == "data")["entry"]
+        # 模拟清理器认领后崩溃: 条目已改名为 .reaping，里面还有只读目录
+        os.rename(entry, entry + self.mgr.trash.REAPING)
+        os.chmod(os.path.join(entry + self.mgr.trash.REAPING, "item", "extensions"), 0o555)
+
+        claimed = [e for e in self.mgr.trash.entries() if e["reaping"]]
+        self.assertEqual(len(claimed), 1)
+        self.assertFalse(claimed[0]["restorable"])
+        removed, _ = self.mgr.trash.reap()
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.lexists(entry + self.mgr.trash.REAPING))
+        # 撤销期内的 bundle 条目不受影响
+        self.assertEqual([e["kind"] for e in self.mgr.trash.entries()], ["bundle"])
+
+    def test_purge_is_throttled(self):
+        self.create_instance("alpha")
+        self.mgr.delete_resources("alpha", delete_data=False)
+        entry = self.mgr.trash.entries()[0]["entry"]
+        for i in range(300):
+            open(os.path.join(entry, "item", f"f{i}"), "w").close()
+        self.mgr.trash.rate = 1000
+        start = time.monotonic()
+        self.mgr.trash.reap(force=True)
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+        self.assertEqual(self.mgr.trash.entries(), [])
+
+    def test_kick_spawns_a_reaper_only_when_there_is_work(self):
+        self.mgr.trash.kick()
+        self.spawn_reaper.assert_not_called()
+        self.create_instance("alpha")
+        self.delete("alpha")
+        self.spawn_reaper.assert_called_once()
+
+class TrashDisabledTest(AGMTestCase):
+    config = {"trash": False}
+
+    def test_delete_removes_in_place(self):
+        app, data = self.create_instance("alpha")
+        self.mgr.delete_resources("alpha", delete_data=True)
+        self.assertFalse(os.path.lexists(app))
+        self.assertFalse(os.path.lexists(data))
+        self.assertEqual(self.mgr.trash.entries(), [])
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(app), ".agm_trash")))
+
+if __name__ == "__main__":
+    unittest.main()